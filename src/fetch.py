@@ -4,20 +4,39 @@ from email import message_from_bytes
 from email.header import decode_header
 from email.utils import parsedate_to_datetime
 from datetime import datetime, timedelta, timezone
-from typing import List, Dict, Any, Tuple, Optional
+from typing import List, Dict, Any, Tuple, Optional, Iterator
 import logging
 import re
 import html
 import hashlib
+from functools import lru_cache
 
 logger = logging.getLogger(__name__)
 
+# messages per FETCH command; one round-trip per batch instead of per message
+FETCH_BATCH_SIZE = 50
+# PEEK keeps the \Seen flag untouched, INTERNALDATE is the fallback for a broken Date header
+FETCH_SPEC = "(BODY.PEEK[] INTERNALDATE)"
+
 def _imap_date_str(dt: datetime) -> str:
     return dt.strftime("%d-%b-%Y")
 
 def _decode_mime_words(s: Optional[str]) -> str:
     if not s:
         return ""
+    if isinstance(s, str):
+        if "=?" not in s:
+            # no encoded words (the common case): decode_header would return it unchanged
+            return s
+        return _decode_mime_words_cached(s)
+    return _decode_mime_words_uncached(s)
+
+@lru_cache(maxsize=2048)
+def _decode_mime_words_cached(s: str) -> str:
+    # the same encoded subjects/senders recur across one digest run
+    return _decode_mime_words_uncached(s)
+
+def _decode_mime_words_uncached(s) -> str:
     parts = decode_header(s)
     out = []
     for bytes_, enc in parts:
@@ -30,22 +49,34 @@ def _decode_mime_words(s: Optional[str]) -> str:
             out.append(str(bytes_))
     return "".join(out)
 
+BOILERPLATE_PATTERNS = [
+    r"view (this )?in (your )?browser[:].*?$",
+    r"unsubscribe[:].*?$",
+    r"to unsubscribe.*?$",
+    r"if you no longer wish to receive.*?$",
+    r"click here to view.*?$",
+    r"preferences[:].*$",
+    r"manage your subscription.*?$",
+]
+
+# one alternation instead of a re.sub pass per pattern. The leftmost match wins, so a line
+# like "to unsubscribe: click" goes as a whole (sequential passes left "to " behind)
+_BOILERPLATE_RE = re.compile("|".join(f"(?:{p})" for p in BOILERPLATE_PATTERNS),
+                             re.IGNORECASE | re.DOTALL | re.MULTILINE)
+_MULTI_NL_RE = re.compile(r"\n{3,}")
+_UNSUB_ANCHOR_RE = re.compile(r'(?is)<a[^>]*>(view in browser|unsubscribe|manage your subscription)[^<]*</a>')
+_HTML_COMMENT_RE = re.compile(r'(?is)<!--.*?-->')
+_UNSUBSCRIBE_RE = re.compile(r"\bunsubscribe\b", re.IGNORECASE)
+_FETCH_SEQ_RE = re.compile(rb"\s*(\d+)")
+_INTDATE_RE = re.compile(rb'INTERNALDATE "([^"]+)"')
+# "Tue, 13 Oct 2026 08:00:00 +0200" (optional weekday, optional trailing "(CEST)" comment)
+_DATE_FAST_RE = re.compile(r'\s*(?:[A-Za-z]{3},\s*)?(\d{1,2})\s+([A-Za-z]{3})\s+(\d{4})\s+(\d\d):(\d\d):(\d\d)\s*([+-])(\d\d)(\d\d)\s*(?:\([^()]*\)\s*)?$')
+
 def _clean_boilerplate_text(text: str) -> str:
     if not text:
         return ""
-    patterns = [
-        r"(?is)view (this )?in (your )?browser[:].*?$",
-        r"(?is)unsubscribe[:].*?$",
-        r"(?is)to unsubscribe.*?$",
-        r"(?is)if you no longer wish to receive.*?$",
-        r"(?is)click here to view.*?$",
-        r"(?is)preferences[:].*$",
-        r"(?is)manage your subscription.*?$",
-    ]
-    s = text
-    for p in patterns:
-        s = re.sub(p, "", s, flags=re.MULTILINE)
-    s = re.sub(r"\n{3,}", "\n\n", s)
+    s = _BOILERPLATE_RE.sub("", text)
+    s = _MULTI_NL_RE.sub("\n\n", s)
     return s.strip()
 
 def _extract_text_html(msg) -> Tuple[str, str]:
@@ -54,6 +85,9 @@ def _extract_text_html(msg) -> Tuple[str, str]:
     if msg.is_multipart():
         for part in msg.walk():
             ctype = part.get_content_type()
+            # images and other non-text parts are never used: skip them before base64 decoding
+            if ctype not in ("text/plain", "text/html"):
+                continue
             disp = str(part.get("Content-Disposition") or "")
             if "attachment" in disp.lower():
                 continue
@@ -71,6 +105,9 @@ def _extract_text_html(msg) -> Tuple[str, str]:
                 text = chunk
             elif ctype == "text/html" and not html_content:
                 html_content = chunk
+            if text and html_content:
+                # both bodies found, later parts would be ignored anyway
+                break
     else:
         try:
             payload = msg.get_payload(decode=True)
@@ -80,26 +117,169 @@ def _extract_text_html(msg) -> Tuple[str, str]:
             text = msg.get_payload()
     text = _clean_boilerplate_text(text or "")
     if html_content:
-        html_content = re.sub(r'(?is)<a[^>]*>(view in browser|unsubscribe|manage your subscription)[^<]*</a>', '', html_content)
-        html_content = re.sub(r'(?is)<!--.*?-->', '', html_content)
+        html_content = _UNSUB_ANCHOR_RE.sub('', html_content)
+        html_content = _HTML_COMMENT_RE.sub('', html_content)
     else:
         html_content = "<pre style='white-space:pre-wrap;font-family:inherit;'>" + html.escape(text or "") + "</pre>"
     return (text or "", html_content or "")
 
+# runs between the line boundaries str.splitlines() recognizes
+_LINE_RE = re.compile("[^\n\r\x0b\x0c\x1c\x1d\x1e\x85\u2028\u2029]+")
+
+def _first_line(text: str, limit: int) -> str:
+    """
+    First non-empty line, stripped and cut to limit; same lines as splitlines(),
+    but stops at the first non-empty one instead of splitting the whole body.
+    """
+    for m in _LINE_RE.finditer(text):
+        line = m.group().strip()
+        if line:
+            return line[:limit]
+    return ""
+
 def _is_newsletter(msg, text: str) -> bool:
-    if msg.get("List-Unsubscribe"):
+    # cheap header lookups first, the body scan only when none of them decides
+    if msg.get("List-Unsubscribe") or msg.get("List-Id"):
         return True
-    combined = (msg.get("Subject") or "") + "\n" + (msg.get("From") or "") + "\n" + (text or "")
-    if re.search(r"\bunsubscribe\b", combined, flags=re.I):
+    if (msg.get("Precedence") or "").strip().lower() in ("bulk", "list"):
         return True
+    for part in (msg.get("Subject"), msg.get("From"), text):
+        if part and _UNSUBSCRIBE_RE.search(part):
+            return True
     return False
 
 def _compute_fallback_hash(subject: str, date: datetime, text: str) -> str:
-    h = hashlib.sha256()
-    payload = (subject or "") + "|" + date.isoformat() + "|" + (text or "")
-    h.update(payload.encode("utf-8", errors="ignore"))
+    # dedup fingerprint only, no security requirement: BLAKE2b beats SHA-256 in software,
+    # and hashing the pieces separately avoids building one big concatenated string
+    h = hashlib.blake2b(digest_size=32)
+    h.update((subject or "").encode("utf-8", errors="ignore"))
+    h.update(b"|" + date.isoformat().encode("ascii") + b"|")
+    h.update((text or "").encode("utf-8", errors="ignore"))
     return h.hexdigest()
 
+def _parse_internaldate(value: bytes) -> Optional[datetime]:
+    """
+    Parse IMAP INTERNALDATE value, e.g. b'17-Jul-1996 02:44:25 -0700'.
+    """
+    try:
+        return datetime.strptime(value.decode("ascii").strip(), "%d-%b-%Y %H:%M:%S %z")
+    except Exception:
+        return None
+
+_MONTHS = {m: i for i, m in enumerate(
+    ("jan", "feb", "mar", "apr", "may", "jun", "jul", "aug", "sep", "oct", "nov", "dec"), 1)}
+
+@lru_cache(maxsize=4096)
+def parse_date_header(value: str) -> Optional[datetime]:
+    """
+    Parse a Date header into an aware datetime (naive -> UTC); None when unparseable.
+    Cached: messages of one thread or campaign often carry the same Date string.
+    """
+    m = _DATE_FAST_RE.match(value)
+    if m and m.group(2).lower() in _MONTHS:
+        # plain RFC 5322 date with a numeric offset: no need for the generic parser
+        day, mon, year, hh, mm, ss, sign, oh, om = m.groups()
+        offset = timedelta(hours=int(oh), minutes=int(om))
+        try:
+            return datetime(int(year), _MONTHS[mon.lower()], int(day), int(hh), int(mm), int(ss),
+                            tzinfo=timezone(-offset if sign == "-" else offset))
+        except ValueError:
+            pass
+    try:
+        dt = parsedate_to_datetime(value)
+    except Exception:
+        return None
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    return dt
+
+def _iter_fetch_response(fetch_data) -> Iterator[Tuple[bytes, bytes, Optional[bytes]]]:
+    """
+    Walk a multi-message FETCH response and yield (uid, raw message, INTERNALDATE).
+    Each message arrives as a (header, literal) tuple followed by the closing
+    bytes item; INTERNALDATE may be reported in either of them.
+    """
+    pending = None
+    for item in fetch_data:
+        if isinstance(item, tuple):
+            if pending is not None:
+                yield tuple(pending)
+            header = item[0] or b""
+            m_uid = _FETCH_SEQ_RE.match(header)
+            m_date = _INTDATE_RE.search(header)
+            pending = [m_uid.group(1) if m_uid else b"", item[1], m_date.group(1) if m_date else None]
+        elif pending is not None and isinstance(item, bytes):
+            if pending[2] is None:
+                m_date = _INTDATE_RE.search(item)
+                pending[2] = m_date.group(1) if m_date else None
+            yield tuple(pending)
+            pending = None
+    if pending is not None:
+        yield tuple(pending)
+
+def _fetch_raw(M, msg_set: bytes) -> Optional[List[Tuple[bytes, bytes, Optional[bytes]]]]:
+    """
+    FETCH one message set; None when the command fails (non-OK status or an exception).
+    """
+    try:
+        status, fetch_data = M.fetch(msg_set, FETCH_SPEC)
+    except Exception as e:
+        logger.exception("IMAP fetch failed for %r: %s", msg_set, e)
+        return None
+    if status != "OK" or not fetch_data:
+        logger.error("IMAP fetch failed for %r: %s", msg_set, status)
+        return None
+    return list(_iter_fetch_response(fetch_data))
+
+def _parse_one(item: Tuple[bytes, bytes, Optional[bytes]]) -> Optional[Dict[str, Any]]:
+    """
+    Parse one fetched message into the result dict; None when it has no usable date.
+    """
+    uid, raw, internaldate = item
+    try:
+        msg = message_from_bytes(raw)
+
+        date_hdr = msg.get("Date")
+        msg_dt = parse_date_header(date_hdr) if isinstance(date_hdr, str) and date_hdr else None
+
+        if msg_dt is None and internaldate:
+            msg_dt = _parse_internaldate(internaldate)
+
+        if msg_dt is None:
+            return None
+
+        raw_subject = msg.get("Subject", "(no subject)")
+        subject = _decode_mime_words(raw_subject)
+        frm = _decode_mime_words(msg.get("From", "(no from)"))
+
+        text, html_content = _extract_text_html(msg)
+        newsletter = _is_newsletter(msg, text)
+
+        snippet = _first_line(text or "", 400)
+
+        message_id = (msg.get("Message-ID") or msg.get("MessageID") or "").strip()
+        # normalize angle brackets
+        if message_id.startswith("<") and message_id.endswith(">"):
+            message_id = message_id[1:-1]
+        fallback = _compute_fallback_hash(subject, msg_dt, text or "")
+
+        return {
+            "uid": uid.decode() if isinstance(uid, bytes) else str(uid),
+            "message_id": message_id or None,
+            "fallback_hash": fallback,
+            "subject": subject,
+            "from": frm,
+            "date": msg_dt,
+            "text": text,
+            "html": html_content,
+            "snippet": snippet,
+            "is_newsletter": newsletter,
+            "raw_subject": raw_subject,
+        }
+    except Exception as e:
+        logger.exception("Error parsing uid %r: %s", uid, e)
+        return None
+
 def fetch_messages_since(imap_host: str, imap_user: str, imap_password: str,
                          since_dt: datetime, mailbox: str = "INBOX") -> List[Dict[str, Any]]:
     """
@@ -117,84 +297,25 @@ def fetch_messages_since(imap_host: str, imap_user: str, imap_password: str,
         status, data = M.search(None, "SINCE", since_date_str)
         if status != "OK":
             logger.error("IMAP search failed: %s", status)
-            return results
+            return []
 
         uids = data[0].split()
         logger.info("Found %d candidate messages from IMAP search", len(uids))
 
-        for uid in uids:
-            try:
-                status, fetch_data = M.fetch(uid, '(RFC822)')
-                if status != "OK" or not fetch_data or not isinstance(fetch_data[0], tuple):
-                    continue
-                raw = fetch_data[0][1]
-                msg = message_from_bytes(raw)
-
-                date_hdr = msg.get("Date")
-                msg_dt = None
-                if date_hdr:
-                    try:
-                        msg_dt = parsedate_to_datetime(date_hdr)
-                        if msg_dt.tzinfo is None:
-                            msg_dt = msg_dt.replace(tzinfo=timezone.utc)
-                    except Exception:
-                        msg_dt = None
-
-                if msg_dt is None:
-                    status2, idata = M.fetch(uid, '(INTERNALDATE)')
-                    if status2 == "OK" and idata and isinstance(idata[0], tuple):
-                        m = re.search(rb'INTERNALDATE "([^"]+)"', idata[0][0])
-                        if m:
-                            try:
-                                idt = m.group(1).decode()
-                                msg_dt = parsedate_to_datetime(idt)
-                                if msg_dt.tzinfo is None:
-                                    msg_dt = msg_dt.replace(tzinfo=timezone.utc)
-                            except Exception:
-                                msg_dt = None
-
-                if msg_dt is None:
-                    continue
-
-                raw_subject = msg.get("Subject", "(no subject)")
-                subject = _decode_mime_words(raw_subject)
-                frm = _decode_mime_words(msg.get("From", "(no from)"))
-
-                text, html_content = _extract_text_html(msg)
-                newsletter = _is_newsletter(msg, text)
-
-                # snippet
-                snippet = ""
-                for line in (text or "").splitlines():
-                    line = line.strip()
-                    if line:
-                        snippet = line
-                        break
-                if snippet:
-                    snippet = snippet[:400]
-
-                message_id = (msg.get("Message-ID") or msg.get("MessageID") or "").strip()
-                # normalize angle brackets
-                if message_id.startswith("<") and message_id.endswith(">"):
-                    message_id = message_id[1:-1]
-                fallback = _compute_fallback_hash(subject, msg_dt, text or "")
-
-                results.append({
-                    "uid": uid.decode() if isinstance(uid, bytes) else str(uid),
-                    "message_id": message_id or None,
-                    "fallback_hash": fallback,
-                    "subject": subject,
-                    "from": frm,
-                    "date": msg_dt,
-                    "text": text,
-                    "html": html_content,
-                    "snippet": snippet,
-                    "is_newsletter": newsletter,
-                    "raw_subject": raw_subject,
-                })
-            except Exception as e:
-                logger.exception("Error fetching/parsing uid %r: %s", uid, e)
-                continue
+        for i in range(0, len(uids), FETCH_BATCH_SIZE):
+            batch = uids[i:i + FETCH_BATCH_SIZE]
+            fetched = _fetch_raw(M, b",".join(batch))
+            if fetched is None and len(batch) > 1:
+                # one bad message must not cost the whole batch: retry them one by one
+                logger.warning("Retrying batch starting at uid %r one message at a time", batch[0])
+                fetched = []
+                for uid in batch:
+                    fetched.extend(_fetch_raw(M, uid) or [])
+            # parsed as each batch arrives: only one batch of raw messages is held at a time
+            for item in fetched or []:
+                r = _parse_one(item)
+                if r is not None:
+                    results.append(r)
 
     results.sort(key=lambda r: r["date"])
     return results
@@ -1,8 +1,10 @@
 #!/usr/bin/env python3
 from email.utils import parseaddr
 from typing import Dict
+from functools import lru_cache
 import logging
 import csv
+import re
 
 logger = logging.getLogger(__name__)
 
@@ -29,10 +31,17 @@ def load_priority_map(path: str) -> Dict[str, int]:
         logger.warning("Priority file not found: %s", path)
     return mp
 
+# bare "user@domain" header without display name, quoting or comments
+_BARE_ADDR_RE = re.compile(r'[A-Za-z0-9_%+-]+(?:\.[A-Za-z0-9_%+-]+)*@[A-Za-z0-9-]+(?:\.[A-Za-z0-9-]+)*')
+
+@lru_cache(maxsize=4096)
 def _extract_email(from_header: str) -> str:
     """
     Extract email part from From header, normalized to lower-case.
+    Cached: digests see the same few senders over and over.
     """
+    if _BARE_ADDR_RE.fullmatch(from_header or ""):
+        return from_header.lower()
     name, email = parseaddr(from_header or "")
     return (email or "").lower()
 
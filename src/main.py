@@ -7,8 +7,9 @@ Main fixes:
 - If sender not in priority map, assign default priority 3 (don't drop messages).
 - Robust date parsing/fallback to avoid crashes in sorting.
 - Write per-message JSON that includes plain_text for client fallback.
-- Embed base64 plain text into data-plain using Jinja |safe so it is not HTML-escaped.
-- Client JS decodes base64, unescapes entities, or fetches messages/<uid>.json fallback.
+- With EMBED_PLAIN_TEXT, embed plain text into data-plain (Jinja |safe, pre-escaped):
+  as-is for ASCII text (data-plain-type="t"), base64 otherwise (data-plain-type="b").
+- Client JS reads/decodes data-plain, or fetches messages/<uid>.json?v=<content_hash>.
 - Added "Vygenerovat PDF" button that generates a printable page (open print dialog) with
   texts of all currently visible newsletters ordered by priority (asc) then newest first.
 """
@@ -17,17 +18,32 @@ import logging
 import json
 import re
 import hashlib
-import base64
+import binascii
 from datetime import datetime, timedelta, timezone
+from operator import itemgetter
+from functools import lru_cache
+from concurrent.futures import ProcessPoolExecutor
+from html import escape
 from pathlib import Path
-from jinja2 import Template
-from typing import Optional
+from jinja2 import Environment, DictLoader, FileSystemBytecodeCache
+from typing import Callable
 from bs4 import BeautifulSoup
-from email.utils import parsedate_to_datetime
-from src.fetch import fetch_messages_since
-from src.summarize import extract_items_from_message
+from src.fetch import fetch_messages_since, parse_date_header
+from src.summarize import extract_items_from_message, lxml_text, TECHNICAL_RE
 from src.filter import load_priority_map, get_priority_for_sender
-import bleach
+
+# nh3 (Rust/ammonia) is much faster than bleach; bleach stays as a fallback
+try:
+    import nh3
+except ImportError:
+    nh3 = None
+    import bleach
+
+# Rust JSON (de)serializer when installed; json otherwise
+try:
+    import orjson
+except ImportError:
+    orjson = None
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -35,18 +51,38 @@ logger = logging.getLogger(__name__)
 PRIORITY_FILE = os.getenv("PRIORITY_FILE", "data/senders_priority.csv")
 CACHE_DIR = Path(os.getenv("CACHE_DIR", "data/cache"))
 CACHE_DIR.mkdir(parents=True, exist_ok=True)
-
-ALLOWED_TAGS = set(bleach.sanitizer.ALLOWED_TAGS) | {
-    "img", "table", "tr", "td", "th", "thead", "tbody", "tfoot", "style"
+# inline every message body (base64) into the index, e.g. for opening it from file://
+# where fetch() of messages/*.json is blocked; off by default to keep the index small
+EMBED_PLAIN_TEXT = os.getenv("EMBED_PLAIN_TEXT", "0").strip().lower() in ("1", "true", "yes")
+# worker processes for sanitizing/summarizing messages; 1 = serial
+PARALLEL_RENDER = int(os.getenv("PARALLEL_RENDER", str(os.cpu_count() or 1)))
+OUT_DIR = Path("data")
+MESSAGES_DIR = OUT_DIR / "messages"
+
+# block-level tags (bleach's HTML_TAGS_BLOCK_LEVEL). bleach's strip=True put a newline in
+# place of each one; nh3 removes disallowed tags without a trace, so they are kept instead:
+# the summarizer splits paragraphs on the text breaks they produce
+BLOCK_TAGS = {
+    "address", "article", "aside", "blockquote", "details", "dialog", "dd", "div", "dl", "dt",
+    "fieldset", "figcaption", "figure", "footer", "form", "h1", "h2", "h3", "h4", "h5", "h6",
+    "header", "hgroup", "hr", "li", "main", "nav", "ol", "p", "pre", "section", "table", "ul",
 }
+# bleach's default allowlist plus tables/images and block tags; sets, as nh3 expects (bleach accepts them too)
+ALLOWED_TAGS = {
+    "a", "abbr", "acronym", "b", "blockquote", "code", "em", "i", "li", "ol", "strong", "ul",
+    "img", "table", "tr", "td", "th", "thead", "tbody", "tfoot"
+} | BLOCK_TAGS
 ALLOWED_ATTRIBUTES = {
-    **bleach.sanitizer.ALLOWED_ATTRIBUTES,
-    "img": ["src", "alt", "title", "width", "height", "loading"],
-    "a": ["href", "title", "rel", "target"],
-    "td": ["colspan", "rowspan"],
-    "th": ["colspan", "rowspan"],
+    "abbr": {"title"},
+    "acronym": {"title"},
+    "img": {"src", "alt", "title", "width", "height", "loading"},
+    "a": {"href", "title", "rel", "target"},
+    "td": {"colspan", "rowspan"},
+    "th": {"colspan", "rowspan"},
 }
-ALLOWED_PROTOCOLS = ["http", "https", "mailto", "data"]
+ALLOWED_PROTOCOLS = {"http", "https", "mailto", "data"}
+# dropped together with their content, not just unwrapped
+CLEAN_CONTENT_TAGS = frozenset({"script", "style"})
 
 INDEX_TEMPLATE = """<!doctype html>
 <html><head><meta charset="utf-8"><title>Newsletter Hell 1.0</title>
@@ -103,7 +139,7 @@ h1.site-title{font-size:2.2rem;margin:0 0 10px 0}
   </div>
 
 {% for m in messages %}
-<article class="msg" id="m-{{ m.safe_id }}" data-uid="{{ m.safe_id }}" data-priority="{{ m._priority }}" data-ts="{{ m._date_ts }}" data-plain='{{ m.plain_b64|safe }}' data-plain-len="{{ (m.plain_b64|default(''))|length }}">
+<article class="msg" id="m-{{ m.safe_id }}" data-uid="{{ m.safe_id }}" data-priority="{{ m._priority }}" data-ts="{{ m._date_ts }}" data-hash="{{ m.content_hash }}"{% if m.plain_data %} data-plain-type="{{ m.plain_type }}" data-plain='{{ m.plain_data|safe }}' data-plain-len="{{ m.plain_data|length }}"{% endif %}>
   <div class="head">
     <div>
       <div class="title-row">
@@ -124,22 +160,35 @@ h1.site-title{font-size:2.2rem;margin:0 0 10px 0}
 
 <script>
 (function(){
+  // one decoder for all messages instead of a new TextDecoder per call
+  var UTF8_DECODER = (typeof TextDecoder !== 'undefined') ? new TextDecoder('utf-8') : null;
+
+  // per-message JSON URL; ?v=<content hash> only changes with the message content,
+  // so a cached copy is reused until the body actually changes
+  function messageUrl(article){
+    var uid = article.getAttribute('data-uid') || '';
+    var hash = article.getAttribute('data-hash');
+    return 'messages/' + uid + '.json' + (hash ? '?v=' + hash : '');
+  }
+
   // helper: robust base64 -> UTF-8 string
   function base64ToUtf8(b64){
     if(!b64) return null;
     if(b64.indexOf('&') !== -1){
       try { var ta = document.createElement('textarea'); ta.innerHTML = b64; b64 = ta.value; } catch(e){ /* ignore */ }
     }
+    // native base64 -> bytes where available, otherwise atob + Uint8Array.from (no per-byte JS loop)
+    if(UTF8_DECODER && typeof Uint8Array.fromBase64 === 'function'){
+      try { return UTF8_DECODER.decode(Uint8Array.fromBase64(b64)); } catch(e){ /* fall through to atob */ }
+    }
     try {
       var bin = atob(b64);
     } catch(e){
       return null;
     }
     try {
-      if(typeof TextDecoder !== 'undefined'){
-        var arr = new Uint8Array(bin.length);
-        for(var i=0;i<bin.length;i++){ arr[i]=bin.charCodeAt(i); }
-        return new TextDecoder('utf-8').decode(arr);
+      if(UTF8_DECODER){
+        return UTF8_DECODER.decode(Uint8Array.from(bin, function(c){ return c.charCodeAt(0); }));
       } else {
         try { return decodeURIComponent(escape(bin)); } catch(e){ return bin; }
       }
@@ -148,7 +197,26 @@ h1.site-title{font-size:2.2rem;margin:0 0 10px 0}
     }
   }
 
-  function escapeHtml(s){ if(!s) return ''; return s.replace(/[&<>"']/g, function(m){return {'&':'&amp;','<':'&lt;','>':'&gt;','"':'&quot;',"'":'&#39;'}[m];}); }
+  // data-plain holds the text itself (type "t", ASCII, attribute-escaped) or base64 of UTF-8
+  function plainFromArticle(article){
+    var data = article.getAttribute('data-plain') || '';
+    if(!data) return '';
+    if(article.getAttribute('data-plain-type') === 't') return data;
+    return base64ToUtf8(data) || '';
+  }
+
+  // built once, not per matched character
+  var ESC = {'&':'&amp;','<':'&lt;','>':'&gt;','"':'&quot;',"'":'&#39;'};
+  function escapeCh(m){ return ESC[m]; }
+  function escapeHtml(s){ if(!s) return ''; return s.replace(/[&<>"']/g, escapeCh); }
+
+  // paragraphs as DOM nodes: textContent lets the browser do the escaping
+  function fillParagraphs(wrapper, parts){
+    parts.forEach(function(p){
+      var el = document.createElement('p'); el.className = 'plain-paragraph'; el.textContent = p;
+      wrapper.appendChild(el);
+    });
+  }
 
   // Render preview (existing logic)
   function renderPlainForArticle(article){
@@ -165,34 +233,35 @@ h1.site-title{font-size:2.2rem;margin:0 0 10px 0}
       return;
     }
 
-    var b64 = article.getAttribute('data-plain') || '';
-    if(b64 && b64.indexOf('&') !== -1){
-      try { var ta = document.createElement('textarea'); ta.innerHTML = b64; b64 = ta.value; } catch(e){ console.warn('unescape failed', e); }
-    }
-
     var plain = '';
-    if(b64){
-      try { plain = decodeURIComponent(escape(window.atob(b64))); console.log('decoded base64 for', article.getAttribute('data-uid')); }
-      catch(e){ console.warn('base64 decode failed', e); plain = ''; }
+    if(article.hasAttribute('data-plain')){
+      plain = plainFromArticle(article);
+      if(plain){ console.log('read embedded plain text for', article.getAttribute('data-uid')); }
+      else { console.warn('embedded plain text decode failed'); }
     }
 
     var renderFromJsonFallback = function(){
       var uid = article.getAttribute('data-uid');
       if(!uid) return;
-      var url = 'messages/' + uid + '.json';
+      var url = messageUrl(article);
       console.log('fetch fallback JSON', url);
       fetch(url).then(function(resp){
         if(!resp.ok) throw new Error('HTTP '+resp.status);
         return resp.json();
       }).then(function(obj){
-        var text = obj.plain_text || obj.overview || (obj.items && obj.items.map(function(it){ return it.summary || it.full_text || it.title; }).join('\\n\\n')) || '';
-        if(!text) text = 'Žádný text k zobrazení.';
-        var parts = text.split(/\\n{2,}|\\r\\n{2,}/).map(function(p){ return p.trim(); }).filter(Boolean);
         var wrapper = document.createElement('div'); wrapper.className = 'plain-rendered';
-        if(parts.length === 0){
-          wrapper.innerHTML = '<p class="plain-paragraph">Žádné nové užitečné informace.</p>';
+        if(obj.plain_render_html){
+          // paragraphs are split and escaped at build time
+          wrapper.innerHTML = obj.plain_render_html;
         } else {
-          wrapper.innerHTML = parts.map(function(p){ return '<p class="plain-paragraph">' + escapeHtml(p) + '</p>'; }).join('');
+          var text = obj.plain_text || obj.overview || (obj.items && obj.items.map(function(it){ return it.summary || it.full_text || it.title; }).join('\\n\\n')) || '';
+          if(!text) text = 'Žádný text k zobrazení.';
+          var parts = text.split(/\\n{2,}|\\r\\n{2,}/).map(function(p){ return p.trim(); }).filter(Boolean);
+          if(parts.length === 0){
+            wrapper.innerHTML = '<p class="plain-paragraph">Žádné nové užitečné informace.</p>';
+          } else {
+            fillParagraphs(wrapper, parts);
+          }
         }
         container.appendChild(wrapper);
         container.setAttribute('data-loaded','true');
@@ -211,7 +280,7 @@ h1.site-title{font-size:2.2rem;margin:0 0 10px 0}
       if(parts.length === 0){
         wrapper.innerHTML = '<p class="plain-paragraph">Žádné nové užitečné informace.</p>';
       } else {
-        wrapper.innerHTML = parts.map(function(p){ return '<p class="plain-paragraph">' + escapeHtml(p) + '</p>'; }).join('');
+        fillParagraphs(wrapper, parts);
       }
       container.appendChild(wrapper);
       container.setAttribute('data-loaded','true');
@@ -221,32 +290,36 @@ h1.site-title{font-size:2.2rem;margin:0 0 10px 0}
     renderFromJsonFallback();
   }
 
+  // two delegated listeners on document instead of a click+keydown pair per title
   function attachTitleHandlers(){
-    document.querySelectorAll('.title[role="button"]').forEach(function(el){
-      el.addEventListener('click', function(ev){
-        var article = el.closest('article.msg');
-        if(article) renderPlainForArticle(article);
-      });
-      el.addEventListener('keydown', function(ev){
-        if(ev.key === 'Enter' || ev.key === ' '){
-          ev.preventDefault();
-          var article = el.closest('article.msg');
-          if(article) renderPlainForArticle(article);
-        }
-      });
+    function titleArticle(ev){
+      var title = ev.target.closest && ev.target.closest('.title[role="button"]');
+      return title ? title.closest('article.msg') : null;
+    }
+    document.addEventListener('click', function(ev){
+      var article = titleArticle(ev);
+      if(article) renderPlainForArticle(article);
+    });
+    document.addEventListener('keydown', function(ev){
+      if(ev.key !== 'Enter' && ev.key !== ' ') return;
+      var article = titleArticle(ev);
+      if(!article) return;
+      ev.preventDefault();
+      renderPlainForArticle(article);
     });
   }
 
+  // one generated style rule hides every article whose priority is not checked:
+  // a single style recalculation instead of an inline style write per article
+  var filterSheet = null;
   function applyPriorityFilter(){
     var checked = Array.from(document.querySelectorAll('.prio-filter')).filter(cb=>cb.checked).map(cb=>cb.getAttribute('data-prio'));
-    document.querySelectorAll('article.msg').forEach(function(article){
-      var p = article.getAttribute('data-priority') || '';
-      if(p && checked.indexOf(p) === -1){
-        article.style.display = 'none';
-      } else {
-        article.style.display = '';
-      }
-    });
+    if(!filterSheet){
+      filterSheet = document.createElement('style');
+      document.head.appendChild(filterSheet);
+    }
+    filterSheet.textContent = 'article.msg[data-priority]:not([data-priority=""])' +
+      checked.map(function(p){ return ':not([data-priority="' + p + '"])'; }).join('') + '{display:none}';
   }
 
   // Build printable document from currently visible articles ordered by priority asc then newest first
@@ -254,7 +327,7 @@ h1.site-title{font-size:2.2rem;margin:0 0 10px 0}
     try{
       // collect visible articles
       var articles = Array.from(document.querySelectorAll('article.msg')).filter(function(a){
-        return a.style.display !== 'none';
+        return getComputedStyle(a).display !== 'none';
       });
       if(articles.length === 0){
         alert('Žádné zobrazené články pro tisk/PDF.');
@@ -285,19 +358,15 @@ h1.site-title{font-size:2.2rem;margin:0 0 10px 0}
         docParts.push('<h2 style="margin:6px 0 4px 0;font-size:16px;">' + escapeHtml(subject) + '</h2>');
         docParts.push('<div style="color:#666;font-size:12px;margin-bottom:8px;">' + escapeHtml(meta) + '</div>');
 
-        // try decode data-plain
-        var b64 = art.getAttribute('data-plain') || '';
-        var text = '';
-        if(b64){
-          text = base64ToUtf8(b64) || '';
-        }
+        // try embedded data-plain
+        var text = plainFromArticle(art);
         if(!text){
           // fallback to fetch messages/<uid>.json
           if(uid){
             try{
               // synchronous fetch sequence
               // eslint-disable-next-line no-await-in-loop
-              var resp = await fetch('messages/' + uid + '.json');
+              var resp = await fetch(messageUrl(art));
               if(resp.ok){
                 var obj = await resp.json();
                 text = obj.plain_text || obj.overview || (obj.items && obj.items.map(function(it){ return it.summary || it.full_text || it.title; }).join('\\n\\n')) || '';
@@ -363,30 +432,44 @@ h1.site-title{font-size:2.2rem;margin:0 0 10px 0}
 </body></html>
 """
 
-# helpers
-TECHNICAL_PATTERNS = [
-    r'(?i)nezobrazuje se vám newsletter správně',
-    r'(?i)if you are having trouble viewing this email',
-    r'(?i)click here to view in your browser',
-    r'(?i)zobrazit v prohlížeči',
-    r'(?i)if you can\'t see images',
-    r'(?i)view in browser',
-    r'(?i)local tracking pixel',
-]
+JINJA_CACHE_DIR = CACHE_DIR / "jinja"
+
+@lru_cache(maxsize=1)
+def index_template():
+    """
+    Compiled once per process, on first use (not at import, so importing this module
+    writes nothing); the bytecode cache lets fresh (cron) processes skip parsing and
+    codegen. autoescape stays off, as with the bare Template used before.
+    The source never changes at runtime (no auto_reload); trim/lstrip drop the blank
+    lines the block tags would otherwise leave in every rendered message.
+    """
+    JINJA_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+    env = Environment(
+        loader=DictLoader({"index.html": INDEX_TEMPLATE}),
+        bytecode_cache=FileSystemBytecodeCache(str(JINJA_CACHE_DIR)),
+        auto_reload=False,
+        trim_blocks=True,
+        lstrip_blocks=True,
+    )
+    return env.get_template("index.html")
 
+# helpers
 URL_RE = re.compile(r'(https?://[^\s\'"<>]+)', re.IGNORECASE)
+_BOILERPLATE_LINE_RE = re.compile(r'(?i)(unsubscribe|odhlásit|preferences|manage your subscription|privacy policy|view in browser|zobrazit v prohlíče)')
+_MULTI_NL_RE = re.compile(r'\n{3,}')
+_SCRIPT_BLOCK_RE = re.compile(r'(?is)<script.*?>.*?</script>')
+_STYLE_BLOCK_RE = re.compile(r'(?is)<style.*?>.*?</style>')
+_ITEM_BOILERPLATE_RE = re.compile(r"(?i)view in browser|unsubscribe|manage your subscription|preferences")
 
 def _strip_technical(text: str) -> str:
-    t = text or ""
-    for p in TECHNICAL_PATTERNS:
-        t = re.sub(p, '', t)
+    t = TECHNICAL_RE.sub('', text or "")
     lines = [ln.strip() for ln in t.splitlines()]
     useful = []
     for ln in lines:
         if not ln: continue
         if len(ln) < 10:
             continue
-        if re.search(r'(?i)(unsubscribe|odhlásit|preferences|manage your subscription|privacy policy|view in browser|zobrazit v prohlíče)', ln):
+        if _BOILERPLATE_LINE_RE.search(ln):
             continue
         useful.append(ln)
     return "\n\n".join(useful).strip()
@@ -396,23 +479,70 @@ def html_to_plain_text(html: str, fallback: str = "") -> str:
         t = fallback
     else:
         try:
-            t = BeautifulSoup(html or "", "html.parser").get_text(separator="\n")
+            # straight from lxml's parser events, no BeautifulSoup wrapper objects
+            t = lxml_text(html or "")
         except Exception:
-            t = fallback or ""
-    t = re.sub(r'\r\n', '\n', t)
+            try:
+                t = BeautifulSoup(html or "", "lxml").get_text(separator="\n")
+            except Exception:
+                t = fallback or ""
+    t = t.replace('\r\n', '\n')
     t = URL_RE.sub(lambda m: f"(odkaz zde: {m.group(1)})", t)
     t = _strip_technical(t)
-    t = re.sub(r'\n{3,}', '\n\n', t).strip()
+    t = _MULTI_NL_RE.sub('\n\n', t).strip()
     return t
 
+# same split as the client: blank-line separated paragraphs
+_PARA_SPLIT_RE = re.compile(r'\n{2,}|\r\n{2,}')
+
+def plain_to_paragraphs_html(text: str) -> str:
+    """
+    Plain text -> escaped <p class="plain-paragraph"> blocks, rendered once at build
+    time instead of on every click in the browser. Empty when there is no text, so the
+    client falls back to overview/items as before.
+    """
+    parts = [escape(p) for p in (p.strip() for p in _PARA_SPLIT_RE.split(text or "")) if p]
+    if not parts:
+        return ""
+    return '<p class="plain-paragraph">' + '</p><p class="plain-paragraph">'.join(parts) + '</p>'
+
+def encode_plain(text: str):
+    """
+    Payload for the data-plain attribute: ("t", escaped text) when the text is ASCII
+    (no base64 inflation, no client decode), else ("b", base64 of UTF-8).
+    """
+    if text.isascii():
+        return "t", escape(text, quote=True)
+    try:
+        return "b", binascii.b2a_base64(text.encode("utf-8"), newline=False).decode("ascii")
+    except Exception:
+        return "", ""
+
+@lru_cache(maxsize=4096)
 def safe_id_for(value: str) -> str:
-    return hashlib.sha256((value or "").encode("utf-8", errors="ignore")).hexdigest()
+    # file-name/DOM id, not a security boundary: 128-bit BLAKE2b is plenty and cheaper than SHA-256
+    return hashlib.blake2b((value or "").encode("utf-8", errors="ignore"), digest_size=16).hexdigest()
+
+# compact JSON for the cache and per-message files: nobody reads them by hand
+JSON_SEPARATORS = (",", ":")
+
+def dump_json(obj) -> bytes:
+    """
+    Compact UTF-8 JSON; orjson serializes straight to bytes, the json fallback
+    produces the same output.
+    """
+    if orjson is not None:
+        return orjson.dumps(obj)
+    return json.dumps(obj, ensure_ascii=False, separators=JSON_SEPARATORS).encode("utf-8")
+
+def load_json(data: bytes):
+    return orjson.loads(data) if orjson is not None else json.loads(data)
 
 def load_cache(uid: str):
     p = CACHE_DIR / f"{uid}.json"
     if p.exists():
         try:
-            return json.loads(p.read_text(encoding="utf-8"))
+            return load_json(p.read_bytes())
         except Exception:
             return None
     return None
@@ -420,16 +550,60 @@ def load_cache(uid: str):
 def save_cache(uid: str, data):
     p = CACHE_DIR / f"{uid}.json"
     try:
-        p.write_text(json.dumps(data, ensure_ascii=False), encoding="utf-8")
+        p.write_bytes(dump_json(data))
     except Exception:
         logger.exception("Failed to write cache for uid=%s", uid)
 
 def sanitize_html(html_content: str) -> str:
-    cleaned = bleach.clean(html_content or "", tags=list(ALLOWED_TAGS), attributes=ALLOWED_ATTRIBUTES, protocols=ALLOWED_PROTOCOLS, strip=True)
-    cleaned = re.sub(r'(?is)<script.*?>.*?</script>', '', cleaned)
-    cleaned = re.sub(r'javascript:', '', cleaned, flags=re.IGNORECASE)
+    if nh3 is not None:
+        # rel is an allowed attribute, so nh3 must not add its own;
+        # <script>/<style> are dropped together with their content
+        cleaned = nh3.clean(html_content or "", tags=ALLOWED_TAGS, attributes=ALLOWED_ATTRIBUTES,
+                            url_schemes=ALLOWED_PROTOCOLS, link_rel=None, clean_content_tags=CLEAN_CONTENT_TAGS)
+    else:
+        # bleach's strip=True would keep the script/CSS source as text
+        html_content = _STYLE_BLOCK_RE.sub('', _SCRIPT_BLOCK_RE.sub('', html_content or ""))
+        cleaned = bleach.clean(html_content, tags=ALLOWED_TAGS, attributes=ALLOWED_ATTRIBUTES, protocols=ALLOWED_PROTOCOLS, strip=True)
+    # no regex post-passes: <script> is not an allowed tag and javascript: is not an
+    # allowed URL scheme, so both sanitizers already removed them
     return cleaned
 
+# bump when html_to_plain_text's output changes (patterns, cleanup steps)
+PLAIN_TEXT_REVISION = 1
+
+def cached_by_content(subdir: str, tag: str, content: str, compute: Callable[[str], str], suffix: str = ".txt") -> str:
+    """
+    Disk memo for a pure str -> str step, keyed by BLAKE2b of tag + content under
+    CACHE_DIR/<subdir>/<h[:2]>/<h><suffix>: the same messages reappear run after run.
+    The tag identifies the producing code/config, so changing it invalidates old entries.
+    """
+    hasher = hashlib.blake2b(tag.encode("utf-8") + b"\0", digest_size=16)
+    hasher.update(content.encode("utf-8", errors="ignore"))
+    h = hasher.hexdigest()
+    p = CACHE_DIR / subdir / h[:2] / f"{h}{suffix}"
+    try:
+        # bytes, not read_text: newline translation would turn \r\n into \n
+        return p.read_bytes().decode("utf-8")
+    except FileNotFoundError:
+        pass
+    except Exception:
+        logger.exception("Failed to read cache %s", p)
+    result = compute(content)
+    try:
+        p.parent.mkdir(parents=True, exist_ok=True)
+        tmp = p.with_suffix(f".{os.getpid()}.tmp")
+        tmp.write_bytes(result.encode("utf-8"))
+        os.replace(tmp, p)
+    except Exception:
+        logger.exception("Failed to write cache %s", p)
+    return result
+
+def plain_text_cached(html: str) -> str:
+    """
+    html_to_plain_text memoized on disk (CACHE_DIR/plain) per raw input.
+    """
+    return cached_by_content("plain", f"plain-r{PLAIN_TEXT_REVISION}", html or "", html_to_plain_text)
+
 def parse_date_to_ts(val) -> int:
     if val is None:
         return 0
@@ -437,31 +611,99 @@ def parse_date_to_ts(val) -> int:
         if isinstance(val, datetime):
             return int(val.astimezone(timezone.utc).timestamp())
         if isinstance(val, str):
-            try:
-                dt = datetime.fromisoformat(val)
-            except Exception:
-                try:
-                    dt = parsedate_to_datetime(val)
-                except Exception:
-                    return 0
-            if dt.tzinfo is None:
-                dt = dt.replace(tzinfo=timezone.utc)
-            return int(dt.timestamp())
+            return _date_str_to_ts(val)
     except Exception:
         return 0
     return 0
 
+@lru_cache(maxsize=4096)
+def _date_str_to_ts(val: str) -> int:
+    # string dates repeat across a newsletter series: parse each distinct one once
+    try:
+        dt = datetime.fromisoformat(val)
+    except Exception:
+        dt = parse_date_header(val)
+        if dt is None:
+            return 0
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    return int(dt.timestamp())
+
 EXCLUDE_SUBJECT_PATTERNS = [
     r"confirm your subscription", r"confirm subscription", r"confirm email", r"verify your email",
     r"verification", r"potvrď", r"ověř", r"ověřte", r"confirm", r"verify", r"action required", r"please confirm"
 ]
 
+_EXCLUDE_SUBJECT_RE = re.compile("|".join(f"(?:{p})" for p in EXCLUDE_SUBJECT_PATTERNS))
+
+@lru_cache(maxsize=4096)
 def subject_is_excluded(subject: str) -> bool:
-    s = (subject or "").lower()
-    for p in EXCLUDE_SUBJECT_PATTERNS:
-        if re.search(p, s):
-            return True
-    return False
+    return _EXCLUDE_SUBJECT_RE.search((subject or "").lower()) is not None
+
+# per-message backup pages; %-formatting, the parts are inserted verbatim
+_MSG_HTML_TPL = "<!doctype html><html><head><meta charset='utf-8'><title>%s</title></head><body>%s</body></html>"
+_MSG_TEXT_TPL = "<!doctype html><html><head><meta charset='utf-8'><title>%s</title></head><body><h1>%s</h1><pre style='white-space:pre-wrap;'>%s</pre></body></html>"
+
+def process_message(m: dict) -> dict:
+    """
+    Sanitize, summarize and write out one selected message; returns only the fields
+    the index template needs on top of the selection ones (the bodies stay out of the
+    pool's result pickles). Top-level so it pickles for the process pool.
+    """
+    raw_html = m.get("html") or ""
+
+    raw_id = (m.get("message_id") or m.get("fallback_hash") or m.get("uid") or "")
+    safe_id = safe_id_for(raw_id)
+
+    cached = load_cache(safe_id)
+    if cached is not None:
+        summary_obj = cached
+    else:
+        try:
+            # the sanitized HTML only feeds the summarizer: needed on a summary-cache miss only
+            sanitized = sanitize_html(raw_html)
+            summary_obj = extract_items_from_message(m.get("subject",""), m.get("from",""), m.get("text",""), sanitized, safe_id)
+            items = [it for it in summary_obj.get("items", []) if not _ITEM_BOILERPLATE_RE.search((it.get("full_text") or "") + " " + (it.get("summary") or ""))]
+            summary_obj["items"] = items
+        except Exception as e:
+            logger.exception("Summarize failed uid=%s: %s", safe_id, e)
+            summary_obj = {"overview": "", "items": []}
+        save_cache(safe_id, summary_obj)
+
+    overview = summary_obj.get("overview") or ""
+    items = summary_obj.get("items") or []
+
+    # create plain text (cleaned); inlined into the index only on request (EMBED_PLAIN_TEXT),
+    # otherwise the page fetches messages/<id>.json when a message is opened
+    plain = plain_text_cached(raw_html or m.get("text","") or "")
+    plain_type, plain_data = encode_plain(plain) if EMBED_PLAIN_TEXT else ("", "")
+
+    # write per-message JSON (include plain_text for fallback)
+    j = {
+        "subject": m.get("subject"),
+        "from": m.get("from"),
+        "date": m.get("date"),
+        "priority": m.get("_priority"),
+        "items": items,
+        "overview": overview,
+        "plain_text": plain,
+        "plain_render_html": plain_to_paragraphs_html(plain)
+    }
+    # hash of the rest of the payload; the index passes it as ?v= so clients revalidate
+    # a message only when its content changed
+    content_hash = hashlib.blake2b(dump_json(j), digest_size=8).hexdigest()
+    j["content_hash"] = content_hash
+    # serialized in one go and written with a single write() call
+    (MESSAGES_DIR / f"{safe_id}.json").write_bytes(dump_json(j))
+
+    # write per-message HTML file as backup
+    subj = m.get("subject") or ""
+    if raw_html.strip():
+        msg_html = _MSG_HTML_TPL % (subj, raw_html)
+    else:
+        msg_html = _MSG_TEXT_TPL % (subj, subj, m.get("text") or "")
+    (MESSAGES_DIR / f"{safe_id}.html").write_text(msg_html, encoding="utf-8")
+    return {"safe_id": safe_id, "plain_type": plain_type, "plain_data": plain_data, "content_hash": content_hash}
 
 def main():
     IMAP_HOST = os.getenv("IMAP_HOST")
@@ -475,7 +717,9 @@ def main():
     logger.info("Loaded %d priority entries (file: %s)", len(priority_map), PRIORITY_FILE)
 
     # ALWAYS last 7 days up to now
-    now = datetime.utcnow().replace(tzinfo=timezone.utc)
+    now = datetime.now(timezone.utc)
+    # one timestamp for the whole run: fallback for messages without a usable date
+    now_ts = int(now.timestamp())
     start_dt = now - timedelta(days=7)
     end_dt = now
     logger.info("Window: %s -> %s (UTC)", start_dt.isoformat(), end_dt.isoformat())
@@ -483,18 +727,15 @@ def main():
     msgs = fetch_messages_since(IMAP_HOST, IMAP_USER, IMAP_PASSWORD, start_dt, mailbox="INBOX")
     logger.info("IMAP candidates: %d", len(msgs))
 
-    seen = set(); unique=[]
+    # dedupe and selection in one pass over the candidates
+    seen = set(); selected=[]
     for m in msgs:
         mid = (m.get("message_id") or "").strip()
         key = mid if mid else m.get("fallback_hash") or m.get("uid")
         if not key:
             continue
         if key in seen: continue
-        seen.add(key); unique.append(m)
-    logger.info("After dedupe: %d", len(unique))
-
-    selected=[]
-    for m in unique:
+        seen.add(key)
         try:
             if not m.get("is_newsletter"):
                 continue
@@ -505,14 +746,11 @@ def main():
             if pr is None:
                 pr = 3
             m["_priority"] = int(pr)
-            raw_html = m.get("html","") or ""
-            m["raw_html"] = raw_html
-            m["html"] = sanitize_html(raw_html)
             # date normalization
             dt_val = m.get("date") or m.get("internal_date") or None
             ts = parse_date_to_ts(dt_val)
             if ts == 0:
-                ts = int(datetime.utcnow().replace(tzinfo=timezone.utc).timestamp())
+                ts = now_ts
             m["_date_ts"] = ts
             # keep date string
             try:
@@ -521,80 +759,38 @@ def main():
                 elif isinstance(dt_val, str):
                     m["date"] = dt_val
                 else:
-                    m["date"] = datetime.utcfromtimestamp(ts).replace(tzinfo=timezone.utc).isoformat()
+                    m["date"] = datetime.fromtimestamp(ts, timezone.utc).isoformat()
             except Exception:
                 m["date"] = str(dt_val or "")
             selected.append(m)
         except Exception:
             logger.exception("Skipping message during selection: %s", m.get("subject"))
 
+    logger.info("After dedupe: %d", len(seen))
     logger.info("Selected by priority & newsletter filter: %d", len(selected))
 
-    # sort by priority asc, then newest first
-    selected_sorted = sorted(selected, key=lambda x: (x.get("_priority", 999), -int(x.get("_date_ts", 0))))
-
-    out_dir = Path("data"); out_dir.mkdir(parents=True, exist_ok=True)
-    messages_dir = out_dir / "messages"; messages_dir.mkdir(parents=True, exist_ok=True)
+    # sort by priority asc, then newest first: two stable sorts on C-level itemgetter keys
+    # instead of building a tuple in a Python lambda per message
+    selected_sorted = sorted(selected, key=itemgetter("_date_ts"), reverse=True)
+    selected_sorted.sort(key=itemgetter("_priority"))
 
-    for m in selected_sorted:
-        raw_id = (m.get("message_id") or m.get("fallback_hash") or m.get("uid") or "")
-        safe_id = safe_id_for(raw_id)
-        m["safe_id"] = safe_id
+    OUT_DIR.mkdir(parents=True, exist_ok=True)
+    MESSAGES_DIR.mkdir(parents=True, exist_ok=True)
 
-        cached = load_cache(safe_id)
-        if cached is not None:
-            summary_obj = cached
-        else:
-            try:
-                summary_obj = extract_items_from_message(m.get("subject",""), m.get("from",""), m.get("text",""), m.get("html",""), safe_id)
-                items = [it for it in summary_obj.get("items", []) if not re.search(r"(?i)view in browser|unsubscribe|manage your subscription|preferences", (it.get("full_text") or "") + " " + (it.get("summary") or ""))]
-                summary_obj["items"] = items
-            except Exception as e:
-                logger.exception("Summarize failed uid=%s: %s", safe_id, e)
-                summary_obj = {"overview": "", "items": []}
-            save_cache(safe_id, summary_obj)
-
-        m["overview"] = summary_obj.get("overview") or ""
-        m["_items"] = summary_obj.get("items") or []
-
-        # create plain text (cleaned) and base64 encode
-        raw_html = m.get("raw_html") or ""
-        plain = html_to_plain_text(raw_html or m.get("text","") or "")
-        try:
-            b64 = base64.b64encode(plain.encode("utf-8")).decode("ascii")
-        except Exception:
-            b64 = ""
-        m["plain_b64"] = b64
-
-        # write per-message JSON (include plain_text for fallback)
-        j = {
-            "subject": m.get("subject"),
-            "from": m.get("from"),
-            "date": m.get("date"),
-            "priority": m.get("_priority"),
-            "items": m["_items"],
-            "overview": m["overview"],
-            "plain_text": plain
-        }
-        (messages_dir / f"{safe_id}.json").write_text(json.dumps(j, ensure_ascii=False), encoding="utf-8")
-
-        # write per-message HTML file as backup
-        if raw_html.strip():
-            msg_html = "<!doctype html><html><head><meta charset='utf-8'><title>{}</title></head><body>{}</body></html>".format(
-                (m.get("subject") or "").replace("</","</"), raw_html
-            )
-        else:
-            msg_html = "<!doctype html><html><head><meta charset='utf-8'><title>{}</title></head><body><h1>{}</h1><pre style='white-space:pre-wrap;'>{}</pre></body></html>".format(
-                (m.get("subject") or ""), (m.get("subject") or ""), (m.get("text") or "")
-            )
-        (messages_dir / f"{safe_id}.html").write_text(msg_html, encoding="utf-8")
+    # messages are independent and the work is CPU-bound (GIL): spread it over processes
+    if PARALLEL_RENDER > 1 and len(selected_sorted) > 1:
+        with ProcessPoolExecutor(max_workers=PARALLEL_RENDER) as ex:
+            rendered = list(ex.map(process_message, selected_sorted, chunksize=8))
+    else:
+        rendered = [process_message(m) for m in selected_sorted]
+    for m, r in zip(selected_sorted, rendered):
+        m.update(r)
 
     # render index
     period_start = start_dt.strftime("%d/%m/%Y")
     period_end = end_dt.strftime("%d/%m/%Y")
-    index_t = Template(INDEX_TEMPLATE)
-    html = index_t.render(messages=selected_sorted, period_start=period_start, period_end=period_end)
-    (out_dir / "test_digest.html").write_text(html, encoding="utf-8")
+    html = index_template().render(messages=selected_sorted, period_start=period_start, period_end=period_end)
+    (OUT_DIR / "test_digest.html").write_text(html, encoding="utf-8")
     logger.info("Generated %d messages. Digest saved to data/test_digest.html", len(selected_sorted))
 
 if __name__ == "__main__":
@@ -2,22 +2,35 @@
 """
 Local email extractor + extractive summarizer (no OpenAI).
 Usage: python src/process_email.py path/to/email.eml --sentences 4
-Requires: beautifulsoup4, sumy, nltk
+Requires: beautifulsoup4, lxml, sumy, nltk, numpy
 """
 import argparse
 import re
+from html import escape
 from email import policy
 from email.parser import BytesParser
 from bs4 import BeautifulSoup
 
 try:
+    import numpy as np
     from sumy.parsers.plaintext import PlaintextParser
     from sumy.nlp.tokenizers import Tokenizer
-    from sumy.summarizers.lex_rank import LexRankSummarizer
 except Exception:
-    PlaintextParser = Tokenizer = LexRankSummarizer = None
+    np = PlaintextParser = Tokenizer = None
+
+# LexRank parameters, same as sumy's LexRankSummarizer defaults
+LEXRANK_THRESHOLD = 0.1
+LEXRANK_EPSILON = 0.1
+LEXRANK_MAX_ITER = 1000
 
 URL_RE = re.compile(r'(https?://[^\s\)]+)', re.IGNORECASE)
+LINK_PLACEHOLDER_RE = re.compile(r'\(odkaz zde:\s*(https?://[^\s\)]+)\)')
+LINK_ANCHOR = r'(<a href="\1" target="_blank" rel="noopener noreferrer">odkaz zde</a>)'
+UNSUBSCRIBE_RE = re.compile(r'\b(unsubscribe|odhlásit|preferences|nastavení|newsletter)\b', re.IGNORECASE)
+SENTENCE_SPLIT_RE = re.compile(r'(?<=[.!?])\s+')
+MULTI_NL_RE = re.compile(r'\n{3,}')
+QUOTE_HEADER_RE = re.compile(r'On .* wrote:')
+MULTI_SPACE_RE = re.compile(r'[ \t]{2,}')
 
 def extract_text_from_raw_email_bytes(raw_bytes):
     msg = BytesParser(policy=policy.default).parsebytes(raw_bytes)
@@ -38,7 +51,7 @@ def extract_text_from_raw_email_bytes(raw_bytes):
                     continue
                 charset = part.get_content_charset() or "utf-8"
                 html = payload.decode(charset, errors="replace")
-                text = BeautifulSoup(html, "html.parser").get_text(separator="\n")
+                text = BeautifulSoup(html, "lxml").get_text(separator="\n")
                 parts.append(text)
     else:
         ctype = msg.get_content_type()
@@ -47,7 +60,7 @@ def extract_text_from_raw_email_bytes(raw_bytes):
             charset = msg.get_content_charset() or "utf-8"
             text = payload.decode(charset, errors="replace")
             if ctype == "text/html":
-                text = BeautifulSoup(text, "html.parser").get_text(separator="\n")
+                text = BeautifulSoup(text, "lxml").get_text(separator="\n")
             parts.append(text)
     return "\n\n".join(parts).strip()
 
@@ -56,7 +69,7 @@ def remove_quoted_text(text):
     for line in text.splitlines():
         if line.strip().startswith(">"):
             continue
-        if re.match(r'On .* wrote:', line):
+        if QUOTE_HEADER_RE.match(line):
             break
         lines.append(line)
     return "\n".join(lines)
@@ -70,9 +83,9 @@ def remove_signature(text):
     return text
 
 def normalize_whitespace(text):
-    text = re.sub(r'\r\n', '\n', text)
-    text = re.sub(r'\n{3,}', '\n\n', text)
-    text = re.sub(r'[ \t]{2,}', ' ', text)
+    text = text.replace('\r\n', '\n')
+    text = MULTI_NL_RE.sub('\n\n', text)
+    text = MULTI_SPACE_RE.sub(' ', text)
     return text.strip()
 
 def replace_links_with_placeholder(text):
@@ -88,28 +101,91 @@ def clean_email_text(text):
     t = replace_links_with_placeholder(t)
     return t
 
+def lexrank(sentences, sentences_count):
+    """
+    LexRank over sumy sentences, returning the best ones in document order.
+    Same algorithm as sumy's LexRankSummarizer (idf-modified cosine, thresholded
+    graph, power method), but the similarity matrix is one matrix product
+    instead of a Python loop over every sentence pair.
+    """
+    n = len(sentences)
+    if n == 0 or sentences_count <= 0:
+        return []
+    vocab = {}
+    rows, cols = [], []
+    for i, s in enumerate(sentences):
+        for w in s.words:
+            rows.append(i)
+            cols.append(vocab.setdefault(w.lower(), len(vocab)))
+    counts = np.zeros((n, max(len(vocab), 1)))
+    np.add.at(counts, (np.array(rows, dtype=np.intp), np.array(cols, dtype=np.intp)), 1)
+
+    max_tf = counts.max(axis=1, keepdims=True)
+    max_tf[max_tf == 0] = 1
+    idf = np.log(n / (1.0 + (counts > 0).sum(axis=0)))
+    weights = counts / max_tf * idf
+    norms = np.sqrt((weights ** 2).sum(axis=1))
+    denom = np.outer(norms, norms)
+    sim = np.divide(weights @ weights.T, denom, out=np.zeros((n, n)), where=denom > 0)
+
+    adjacency = (sim > LEXRANK_THRESHOLD).astype(float)
+    degrees = adjacency.sum(axis=1)
+    degrees[degrees == 0] = 1
+    transition_t = (adjacency / degrees[:, None]).T
+
+    scores = np.full(n, 1.0 / n)
+    with np.errstate(invalid="ignore"):
+        for _ in range(LEXRANK_MAX_ITER):
+            nxt = transition_t @ scores
+            nxt /= np.linalg.norm(nxt)
+            delta = np.linalg.norm(nxt - scores)
+            scores = nxt
+            if not delta > LEXRANK_EPSILON:
+                break
+
+    best = np.argsort(-scores, kind="stable")[:sentences_count]
+    return [sentences[i] for i in sorted(best)]
+
 def extractive_summary(text, sentences_count=3, language="czech"):
     if PlaintextParser is None:
-        raise RuntimeError("sumy library not available. Install dependencies (beautifulsoup4, sumy, nltk).")
+        raise RuntimeError("sumy library not available. Install dependencies (beautifulsoup4, sumy, nltk, numpy).")
     parser = PlaintextParser.from_string(text, Tokenizer(language))
-    summarizer = LexRankSummarizer()
-    sents = summarizer(parser.document, sentences_count)
+    sents = lexrank(parser.document.sentences, sentences_count)
     useful = []
     for s in sents:
         s_str = str(s).strip()
         if len(s_str) < 40:
             continue
-        if re.search(r'\b(unsubscribe|odhlásit|preferences|nastavení|newsletter)\b', s_str, re.IGNORECASE):
+        if UNSUBSCRIBE_RE.search(s_str):
             continue
         useful.append(s_str)
     return useful
 
+def first_sentences(text, n, min_len=0):
+    """
+    Return up to n sentences longer than min_len. Walks sentence boundaries lazily,
+    so the rest of the text is never split once n sentences are found.
+    """
+    out = []
+    if n <= 0:
+        return out
+    start = 0
+    for m in SENTENCE_SPLIT_RE.finditer(text):
+        if m.start() - start > min_len:
+            out.append(text[start:m.start()])
+            if len(out) >= n:
+                return out
+        start = m.end()
+    if len(text) - start > min_len:
+        out.append(text[start:])
+    return out
+
 def to_safe_paragraphs(sentences):
-    paragraphs = []
-    for s in sentences:
-        s = re.sub(r'\(odkaz zde:\s*(https?://[^\s\)]+)\)', r'(<a href="\1" target="_blank" rel="noopener noreferrer">odkaz zde</a>)', s)
-        s = s.replace("\r", "").strip()
-        paragraphs.append(f'<p>{s}</p>')
+    # escape the plain sentence first, then turn the (already escaped) link placeholders into anchors
+    paragraphs = [
+        "<p>" + LINK_PLACEHOLDER_RE.sub(LINK_ANCHOR, escape(s.replace("\r", "").strip())) + "</p>"
+        for s in sentences
+    ]
     return "\n".join(paragraphs)
 
 def process_file(path, sentences=4, language="czech"):
@@ -126,8 +202,7 @@ def process_file(path, sentences=4, language="czech"):
     try:
         useful = extractive_summary(cleaned, sentences_count=sentences, language=language)
     except Exception:
-        sents = re.split(r'(?<=[.!?])\s+', cleaned.strip())
-        useful = [x for x in sents if len(x.strip())>30][:sentences]
+        useful = first_sentences(cleaned.strip(), sentences, min_len=30)
     if not useful:
         return "Žádné nové užitečné informace."
     html = to_safe_paragraphs(useful)
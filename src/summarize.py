@@ -7,9 +7,11 @@ Removes technical boilerplate, extracts informative paragraphs, keeps links sepa
 import logging
 import json
 import re
+from bisect import bisect_left
 from typing import List, Dict, Any, Optional
 from html import escape
 from bs4 import BeautifulSoup
+import lxml.etree
 
 logger = logging.getLogger(__name__)
 
@@ -28,18 +30,92 @@ TECHNICAL_PATTERNS = [
 
 URL_RE = re.compile(r'(https?://[^\s\'"<>)+\)]+)', re.IGNORECASE)
 
+# all technical phrases fused into one alternation -> a single pass over the text; each
+# pattern in its own group so a "|" inside one cannot leak into its neighbours. Shared with main.
+TECHNICAL_RE = re.compile("|".join(f"(?:{p.removeprefix('(?i)')})" for p in TECHNICAL_PATTERNS), re.IGNORECASE)
+_BOILERPLATE_RE = re.compile(r'(?i)(unsubscribe|odhlásit|manage your subscription|preferences|privacy policy|cookie)')
+_SENT_SPLIT_RE = re.compile(r'(?<=[.!?])\s+')
+_PARA_RE = re.compile(r'[^\n]+')
+_MULTI_NL_RE = re.compile(r'\n{3,}')
+
 def _strip_technical(text: str) -> str:
-    t = text or ""
-    for p in TECHNICAL_PATTERNS:
-        t = re.sub(p, '', t)
-    t = re.sub(r'\n{3,}', '\n\n', t).strip()
+    t = TECHNICAL_RE.sub('', text or "")
+    t = _MULTI_NL_RE.sub('\n\n', t).strip()
     return t
 
+_ASCII_SPACES = str.maketrans("", "", "\x20\x0a\x09\x0c\x0d")
+
+class _TextCollector:
+    """
+    lxml parser target collecting text the way BeautifulSoup's lxml builder does:
+    one string per run of character data, whitespace-only runs collapsed to a
+    single newline/space (except inside pre/textarea), script/style text skipped.
+    Works on parser events, so text after a stray </body></html> is kept too.
+    """
+    def __init__(self):
+        self.parts: List[str] = []
+        self.buf: List[str] = []
+        self.skip = 0
+        self.pre = 0
+
+    def _flush(self):
+        if not self.buf:
+            return
+        s = "".join(self.buf)
+        self.buf = []
+        if not self.pre and not s.translate(_ASCII_SPACES):
+            s = "\n" if "\n" in s else " "
+        if not self.skip:
+            self.parts.append(s)
+
+    def start(self, tag, attrib):
+        self._flush()
+        if tag in ("script", "style"):
+            self.skip += 1
+        elif tag in ("pre", "textarea"):
+            self.pre += 1
+
+    def end(self, tag):
+        self._flush()
+        if tag in ("script", "style"):
+            self.skip = max(0, self.skip - 1)
+        elif tag in ("pre", "textarea"):
+            self.pre = max(0, self.pre - 1)
+
+    def data(self, data):
+        self.buf.append(data)
+
+    def comment(self, text):
+        self._flush()
+
+    def pi(self, target, data=None):
+        self._flush()
+
+    def doctype(self, *args):
+        self._flush()
+
+    def close(self) -> str:
+        self._flush()
+        return "\n".join(self.parts)
+
+def lxml_text(html: str) -> str:
+    """
+    Same output as BeautifulSoup(html, "lxml").get_text(separator="\n"), straight from
+    libxml2's parser events without building any tree.
+    """
+    parser = lxml.etree.HTMLParser(target=_TextCollector())
+    parser.feed(html)
+    return parser.close()
+
 def _to_plain_text(html: str, fallback: str = "") -> str:
     if not html and fallback:
         return fallback
     try:
-        return BeautifulSoup(html or "", "html.parser").get_text(separator="\n")
+        return lxml_text(html or "")
+    except Exception:
+        pass
+    try:
+        return BeautifulSoup(html or "", "lxml").get_text(separator="\n")
     except Exception:
         return fallback or ""
 
@@ -50,12 +126,19 @@ def _naive_sections(text: str, html: str) -> Dict[str, Any]:
     overview = " ".join(lines[:3])[:400] if lines else ""
     items: List[Dict[str, Any]] = []
 
+    # boilerplate is located with a single scan over the whole text; each
+    # paragraph is then checked against the hit offsets with a bisect
+    boiler_hits = [m.start() for m in _BOILERPLATE_RE.finditer(plain)]
+
     # paragraphs as candidates
-    paragraphs = [p.strip() for p in re.split(r'\n{1,}', plain) if p.strip()]
     seen = set()
-    for p in paragraphs:
+    for pm in _PARA_RE.finditer(plain):
         if len(items) >= 8:
             break
+        start, end = pm.span()
+        if end - start < 60:
+            continue
+        p = pm.group().strip()
         if len(p) < 60:
             continue
         key = p[:80]
@@ -63,15 +146,17 @@ def _naive_sections(text: str, html: str) -> Dict[str, Any]:
             continue
         seen.add(key)
         # drop boilerplate
-        if re.search(r'(?i)(unsubscribe|odhlásit|manage your subscription|preferences|privacy policy|cookie)', p):
+        i = bisect_left(boiler_hits, start)
+        if i < len(boiler_hits) and boiler_hits[i] < end:
             continue
         # find link
         link_match = URL_RE.search(p)
         link = link_match.group(1) if link_match else None
         # title: first sentence or trimmed start
-        sent = re.split(r'(?<=[.!?])\s+', p.strip())
-        title = (sent[0] if sent else p)[:80]
-        summary = (sent[0] if sent else p)[:300]
+        sent_end = _SENT_SPLIT_RE.search(p)
+        first = p[:sent_end.start()] if sent_end else p
+        title = first[:80]
+        summary = first[:300]
         items.append({
             "title": title,
             "summary": summary,
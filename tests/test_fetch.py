@@ -0,0 +1,102 @@
+import unittest
+from datetime import datetime, timezone
+from email.message import EmailMessage
+from unittest import mock
+
+from src import fetch
+
+
+def _raw(n: int) -> bytes:
+    m = EmailMessage()
+    m["Subject"] = f"Issue {n}"
+    m["From"] = "News <news@example.com>"
+    m["Date"] = "Tue, 13 Oct 2026 08:00:00 +0200"
+    m["Message-ID"] = f"<id{n}@example.com>"
+    m.set_content(f"Body {n}")
+    return bytes(m)
+
+
+class IterFetchResponseTest(unittest.TestCase):
+    def test_internaldate_before_and_after_literal(self):
+        # imaplib shape: (header, literal) tuple, then the closing bytes item
+        data = [
+            (b'1 (INTERNALDATE "13-Oct-2026 09:00:00 +0000" BODY[] {5}', b"raw-1"),
+            b")",
+            (b"2 (BODY[] {5}", b"raw-2"),
+            b' INTERNALDATE "14-Oct-2026 10:30:00 +0200")',
+            (b"3 (BODY[] {5}", b"raw-3"),
+            b")",
+        ]
+        self.assertEqual(list(fetch._iter_fetch_response(data)), [
+            (b"1", b"raw-1", b"13-Oct-2026 09:00:00 +0000"),
+            (b"2", b"raw-2", b"14-Oct-2026 10:30:00 +0200"),
+            (b"3", b"raw-3", None),
+        ])
+
+
+class CleanBoilerplateTextTest(unittest.TestCase):
+    def test_leftmost_pattern_removes_whole_line(self):
+        # the fused alternation drops the boilerplate line from its first match on;
+        # applying the patterns one by one used to leave "to " / "Click here to " behind
+        self.assertEqual(fetch._clean_boilerplate_text("Hello\nto unsubscribe: click\nBye"), "Hello\n\nBye")
+        self.assertEqual(fetch._clean_boilerplate_text("Click here to view in browser: link\nbody"), "body")
+
+    def test_keeps_other_lines(self):
+        self.assertEqual(fetch._clean_boilerplate_text("Top\nView in your browser: x\nEnd"), "Top\n\nEnd")
+
+
+class FirstLineTest(unittest.TestCase):
+    def test_splits_like_splitlines(self):
+        for text in ["\n  \r\nfirst\nsecond", "a\rb", "  \x0cb\x85c", "\u2028 x \u2029y", "", " \n "]:
+            expected = next((l.strip() for l in text.splitlines() if l.strip()), "")
+            self.assertEqual(fetch._first_line(text, 400), expected, repr(text))
+
+    def test_limit(self):
+        self.assertEqual(fetch._first_line("\n" + "x" * 10, 4), "xxxx")
+
+
+class FakeIMAP:
+    """Fails any FETCH whose message set contains a bad number."""
+    def __init__(self, raws, bad):
+        self.raws, self.bad, self.calls = raws, bad, []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def login(self, user, password):
+        return "OK", [b""]
+
+    def select(self, mailbox, readonly=False):
+        return "OK", [str(len(self.raws)).encode()]
+
+    def search(self, charset, *criteria):
+        return "OK", [b" ".join(str(i).encode() for i in range(1, len(self.raws) + 1))]
+
+    def fetch(self, msg_set, spec):
+        self.calls.append(msg_set)
+        nums = [int(n) for n in msg_set.split(b",")]
+        if self.bad in nums:
+            return "NO", [b"fetch failed"]
+        out = []
+        for n in nums:
+            raw = self.raws[n - 1]
+            out.append((b'%d (INTERNALDATE "13-Oct-2026 09:00:00 +0000" BODY[] {%d}' % (n, len(raw)), raw))
+            out.append(b")")
+        return "OK", out
+
+
+class FetchMessagesSinceTest(unittest.TestCase):
+    def test_failed_batch_is_retried_per_message(self):
+        imap = FakeIMAP([_raw(n) for n in range(1, 5)], bad=3)
+        since = datetime(2026, 10, 8, tzinfo=timezone.utc)
+        with mock.patch.object(fetch, "IMAP4_SSL", lambda host: imap):
+            results = fetch.fetch_messages_since("host", "user", "password", since)
+        self.assertEqual(sorted(r["subject"] for r in results), ["Issue 1", "Issue 2", "Issue 4"])
+        self.assertEqual(imap.calls, [b"1,2,3,4", b"1", b"2", b"3", b"4"])
+
+
+if __name__ == "__main__":
+    unittest.main()